@@ -1,17 +1,26 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
 import json
 import os
+import queue
+import re
 import textwrap
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import openai
+import orjson
 import tiktoken
 from dotenv import load_dotenv
 from rich.console import Console
 
-from .tools import TOOLS
+from .tools import TOOLS, Tool, aclose_web_clients
 
 # ---------------------------------------------------------------------------
 # Environment & OpenAI setup
@@ -34,116 +43,261 @@ AGENT_LOGIC = textwrap.dedent(
     3. Identify potential challenges or roadblocks.
     4. Formulate a plan and decide the next concrete action to take.
 
-    Your output must always be a single JSON object.
+    Your message content must always be a single JSON object holding your plan.
 
-    If the task is not yet complete, you must include a tool call in your response. Your JSON response should include both your full plan and the next tool to use.
-    - The `tool` and `arg` fields specify the next action to take.
-    - The other fields are for your planning and reasoning process.
+    If the task is not yet complete, you must also call one or more of the provided functions in the same response.
+    - Each function takes a single string `arg`.
+    - Independent actions (e.g. reading several files) should be requested together as parallel function calls.
+    - The JSON fields are for your planning and reasoning process.
 
-    Example Response (when a tool needs to be run):
-    {{
+    Example Response (when tools need to be run), together with fs_read calls for poem1.txt, poem2.txt and poem3.txt:
+    {
         "state_analysis": "I need to read the contents of three files.",
-        "progress_evaluation": "10% - Just starting, need to read the first file.",
+        "progress_evaluation": "10% - Just starting, need to read the files.",
         "challenges": "The files might not exist.",
-        "next_steps": ["Read poem1.txt", "Read poem2.txt", "Read poem3.txt", "Combine content", "Count words"],
-        "reasoning": "I will start by reading the first file to make progress on the task.",
-        "tool": "fs_read",
-        "arg": "poem1.txt"
-    }}
+        "next_steps": ["Read poem1.txt, poem2.txt and poem3.txt", "Combine content", "Count words"],
+        "reasoning": "The three reads are independent, so I request them all at once."
+    }
 
     When the entire task is complete and no more tools are needed, provide the final answer in the `answer` field.
 
     Example Response (when the task is complete):
-    {{
+    {
         "state_analysis": "All files have been read, combined, and the words have been counted.",
         "progress_evaluation": "100% - The task is complete.",
         "challenges": "None.",
         "next_steps": [],
         "reasoning": "The final word count has been determined, so the task is finished.",
         "answer": "The total word count is 42."
-    }}
+    }
     """
 )
 
-TOOL_MANIFEST = {name: tool.description for name, tool in TOOLS.items()}
+FETCH_RESULT_DESCRIPTION = (
+    "Get the next part of a truncated tool result. "
+    "The argument is the result id, optionally followed by ':offset' (e.g. 'ab12cd34:512')"
+)
+TOOL_MANIFEST = {
+    **{name: tool.description for name, tool in TOOLS.items()},
+    "fetch_result": FETCH_RESULT_DESCRIPTION,
+}
+TOOL_SCHEMAS = [
+    {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {"arg": {"type": "string"}},
+                "required": ["arg"],
+            },
+        },
+    }
+    for name, description in TOOL_MANIFEST.items()
+]
+TOOL_SCHEMAS_JSON = orjson.dumps(TOOL_SCHEMAS).decode()
+
+# Read-only tools that are safe to start while the model is still streaming
+# the rest of its response.
+PREFETCHABLE_TOOLS = {"web_search", "browse_web_page"}
+
+# Tools that can change file sizes/mtimes without touching the CWD's own mtime.
+MUTATING_TOOLS = {"shell", "fs_write"}
+
+# Network tools whose results are reused for a while; fs_read is cached on the
+# file's (mtime, size) instead so edits invalidate it.
+NETWORK_CACHE_TOOLS = {"web_search", "browse_web_page"}
+NETWORK_CACHE_TTL = 600.0
+TOOL_CACHE_SIZE = 256
+
+# Tool results longer than this are kept out of the history; only an excerpt
+# and an id for `fetch_result` are sent to the model.
+RESULT_EXCERPT_CHARS = 512
+RESULT_PAGE_CHARS = 4000
+RESULT_STORE_SIZE = 64
+
+_ERROR_RESULT = re.compile(r"\[(\w+ )?error\]")
+
+# Once history exceeds this many tokens, everything but the most recent
+# messages is folded into a single summary note.
+HISTORY_TOKEN_LIMIT = 6000
+HISTORY_KEEP_RECENT = 4
+HISTORY_COMPACT_MIN_TOKENS = 1000
+SUMMARY_PROMPT = (
+    "Summarize these agent steps in at most 300 tokens. "
+    "Preserve file paths, decisions, and open TODOs."
+)
+
+
+_ROLE_COLORS = {
+    "system": "#e1f5fe",
+    "user": "#e8f5e9",
+    "assistant": "#f5f5f5",
+}
+_DIV_TEMPLATE = (
+    '<div style="background-color: {color}; padding: 2px; margin: 0; border-radius: 5px; font-family: monospace;">'
+    "{body}</div>"
+)
+_MSG_TEMPLATE = _DIV_TEMPLATE.replace("{body}", "<b>{role}</b><br/>{body}")
+
+
+def _call_arg(call: Dict[str, Any]) -> Optional[str]:
+    """Return the ``arg`` of a tool call, or ``None`` if its arguments aren't valid JSON."""
+    try:
+        arg = orjson.loads(call["function"]["arguments"] or "{}").get("arg", "")
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    return arg if isinstance(arg, str) else orjson.dumps(arg).decode()
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    """Text of a message as seen by the model, including any tool call requests."""
+    text = message.get("content") or ""
+    for call in message.get("tool_calls", ()):
+        text += f"\n{call['function']['name']}({call['function']['arguments']})"
+    return text
+
+
+def _compaction_cut(history: Sequence[Dict[str, Any]], keep: int = HISTORY_KEEP_RECENT) -> int:
+    """Index splitting ``history`` into messages to summarize and messages to keep.
+
+    The split is moved back so tool results are never separated from the
+    assistant message that requested them; ``0`` means nothing can be cut.
+    """
+    cut = max(len(history) - keep, 0)
+    while cut > 0 and history[cut]["role"] == "tool":
+        cut -= 1
+    return cut
+
+
+def _format_assistant(message: Dict[str, Any]) -> str:
+    """Render an assistant message (JSON plan plus tool calls) as report HTML."""
+    content = message.get("content") or ""
+    parts: List[str] = []
+    if content:
+        try:
+            payload = orjson.loads(content)
+            parts.append(f"<b>Thought:</b> {payload.get('explanation', '')}<br/>")
+            if payload.get("answer"):
+                parts.append(f"<b>Answer:</b> {payload['answer']}")
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            parts.append(f"<pre>{content}</pre>")
+    for call in message.get("tool_calls", ()):
+        parts.append(f"<b>Tool:</b> {call['function']['name']} | <b>Arg:</b> {_call_arg(call)}<br/>")
+    return "".join(parts)
 
 
 class ReasoningAgent:
     """LLM-driven agent that keeps its own reasoning & execution trace."""
 
-    def __init__(self, model: str = MODEL, max_turns: int = 10):
+    def __init__(self, model: str = MODEL, max_turns: int = 10, max_concurrent: int = 4):
         self.model = model
         self.max_turns = max_turns
-        self.history: List[Dict[str, str]] = []
+        self.client = openai.AsyncOpenAI(api_key=openai.api_key)
+        self._loop = asyncio.new_event_loop()
+        self._tool_semaphore = asyncio.Semaphore(max_concurrent)
+        self._prefetch: Dict[str, asyncio.Task[str]] = {}
+        self.tools: Dict[str, Tool] = {
+            **TOOLS,
+            "fetch_result": Tool("fetch_result", FETCH_RESULT_DESCRIPTION, self._fetch_result),
+        }
+        self._results: OrderedDict[str, str] = OrderedDict()
+        self._tool_cache: OrderedDict[Tuple, Tuple[Optional[float], str]] = OrderedDict()
+        self.history: List[Dict[str, Any]] = []
         self.last_fs_snapshot: str = ""
         self.last_shell_output: str = ""
         self.report_path = Path("query_report.md")
-        self.last_context: List[Dict[str, str]] = []
+        self.last_context: List[Dict[str, Any]] = []
+        self._token_cache: Dict[int, int] = {}
+        self._fs_cache: Optional[Tuple[Tuple[str, Optional[int]], str]] = None
         try:
             self.encoding = tiktoken.encoding_for_model(model)
         except KeyError:
             self.encoding = tiktoken.get_encoding("cl100k_base")
-        with self.report_path.open("w", encoding="utf-8") as f:
-            f.write("# Agent Query Report\n\n")
-
-    def _format_message_for_report(self, message: Dict[str, str], is_fs_unchanged: bool = False) -> str:
+        # The system prompt and tool schemas never change, so the prompt message
+        # is built once and reused as the same object every turn, and both are
+        # tokenized only here.
+        self._static_prefix: List[Dict[str, Any]] = [{"role": "system", "content": AGENT_LOGIC}]
+        self._static_prefix_tokens = sum(
+            len(tokens) for tokens in self.encoding.encode_batch([AGENT_LOGIC, TOOL_SCHEMAS_JSON])
+        )
+        self._report_fh = self.report_path.open("w", encoding="utf-8", buffering=1 << 16)
+        self._report_fh.write("# Agent Query Report\n\n")
+        # Report writes go through a queue so disk I/O never delays an LLM call.
+        self._report_q: queue.Queue[Optional[str]] = queue.Queue()
+        self._report_thread = threading.Thread(target=self._report_worker, daemon=True)
+        self._report_thread.start()
+        atexit.register(self.close)
+
+    def _report_worker(self) -> None:
+        while True:
+            chunk = self._report_q.get()
+            if chunk is None:
+                break
+            self._report_fh.write(chunk)
+            if self._report_q.empty():
+                self._report_fh.flush()
+        self._report_fh.close()
+
+    def _write_report(self, chunk: str) -> None:
+        self._report_q.put(chunk)
+
+    def close(self) -> None:
+        """Flush pending report writes, stop the writer thread and release the event loop."""
+        if self._report_thread.is_alive():
+            self._report_q.put(None)
+            self._report_thread.join()
+        if not self._loop.is_closed():
+            self._cancel_prefetch()
+            self._loop.run_until_complete(aclose_web_clients())
+            self._loop.close()
+
+    def _format_message_for_report(self, message: Dict[str, Any], is_fs_unchanged: bool = False) -> str:
         role = message["role"]
-        content = message["content"]
-
-        colors = {
-            "system": "#e1f5fe",
-            "user": "#e8f5e9",
-            "assistant": "#f5f5f5",
-        }
-        color = colors.get(role, "#ffffff")
-
-        processed_content = ""
-        if role == "assistant":
-            if content.startswith("[tool_result]"):
-                color = "#fffde7"
-                processed_content = f"<b>Tool Result:</b><pre>{content[len('[tool_result]'):].strip()}</pre>"
-            elif content.startswith("[filesystem]"):
-                if is_fs_unchanged:
-                    shell_part = ""
-                    if "[shell_output]" in content:
-                        shell_part = content.split("[shell_output]", 1)[1]
-                        return (
-                            '<div style="background-color: #fff8e1; padding: 2px; margin: 0; border-radius: 5px; font-family: monospace;">'
-                            f'<b>ASSISTANT</b><br/><b>Shell Output:</b><pre>{shell_part.strip()}</pre></div>'
-                        )
-                    else:
-                        return ""
-                color = "#fff8e1"
-                processed_content = f"<b>Filesystem:</b><pre>{content[len('[filesystem]'):].strip()}</pre>"
+        content = message.get("content") or ""
+        if not content and not message.get("tool_calls"):
+            return ""
+
+        color = _ROLE_COLORS.get(role, "#ffffff")
+        if role in ("assistant", "system") and content.startswith("[filesystem]"):
+            if is_fs_unchanged:
+                if "[shell_output]" not in content:
+                    return ""
+                shell_part = content.split("[shell_output]", 1)[1].strip()
+                body = f"<b>Shell Output:</b><pre>{shell_part}</pre>"
             else:
-                try:
-                    payload = json.loads(content)
-                    explanation = payload.get("explanation", "")
-                    tool = payload.get("tool")
-                    arg = payload.get("arg")
-                    answer = payload.get("answer")
-
-                    processed_content = f"<b>Thought:</b> {explanation}<br/>"
-                    if tool:
-                        processed_content += f"<b>Tool:</b> {tool} | <b>Arg:</b> {arg}"
-                    if answer:
-                        processed_content += f"<b>Answer:</b> {answer}"
-                except (json.JSONDecodeError, TypeError):
-                    processed_content = f"<pre>{content}</pre>"
+                body = f"<b>Filesystem:</b><pre>{content[len('[filesystem]'):].strip()}</pre>"
+            color = "#fff8e1"
+        elif role == "tool":
+            color = "#fffde7"
+            body = f"<b>Tool Result:</b><pre>{content.strip()}</pre>"
+        elif role == "assistant":
+            body = _format_assistant(message)
         else:
-            processed_content = f"<pre>{content}</pre>"
+            body = f"<pre>{content}</pre>"
 
-        return (
-            f'<div style="background-color: {color}; padding: 2px; margin: 0; border-radius: 5px; font-family: monospace;">'
-            f'<b>{role.upper()}</b><br/>{processed_content}</div>'
-        )
+        return _MSG_TEMPLATE.format(color=color, role=role.upper(), body=body)
 
-    @staticmethod
-    def _filesystem_snapshot(limit: int = 20) -> str:
+    def _filesystem_snapshot(self, limit: int = 20) -> str:
+        """Return a short ``ls -l`` style listing of the CWD.
+
+        The listing is reused while the directory's mtime is unchanged; tools
+        that may modify files in place reset ``self._fs_cache``.
+        """
         from datetime import datetime
 
+        cwd = Path.cwd()
+        try:
+            dir_mtime = cwd.stat().st_mtime_ns
+        except OSError:
+            dir_mtime = None
+        if self._fs_cache is not None and dir_mtime is not None and self._fs_cache[0] == (str(cwd), dir_mtime):
+            return self._fs_cache[1]
+
         output = []
-        entries = sorted(Path.cwd().iterdir())[:limit]
+        with os.scandir(cwd) as it:
+            entries = sorted(it, key=lambda e: e.name)[:limit]
         for entry in entries:
             try:
                 stat = entry.stat()
@@ -155,92 +309,279 @@ class ReasoningAgent:
                     output.append(f"-rw-r--r-- {size:>10} {mtime} {entry.name}")
             except OSError:
                 output.append(f"?-????-?? ? {'?':>10} ? ? {entry.name}")
-        return "\n".join(output)
-
-    def _build_context(self, user_msg: str) -> List[Dict[str, str]]:
-        script_path = Path(__file__).resolve()
-        agent_logic_prompt = AGENT_LOGIC.format(cwd=Path.cwd(), script_path=script_path)
-        context: List[Dict[str, str]] = [
-            {"role": "system", "content": agent_logic_prompt},
-            {"role": "system", "content": f"TOOL MANIFEST:\n{json.dumps(TOOL_MANIFEST, indent=2)}"},
-        ]
+        snapshot = "\n".join(output)
+        self._fs_cache = ((str(cwd), dir_mtime), snapshot)
+        return snapshot
+
+    def _build_context(self, user_msg: str, fs_snapshot: str) -> List[Dict[str, Any]]:
+        # System prompts and history form a byte-stable prefix across turns so
+        # provider-side prompt caching can reuse it; the volatile environment
+        # snapshot goes last.
+        context: List[Dict[str, Any]] = list(self._static_prefix)
         context.extend(self.history)
+        context.append({"role": "user", "content": user_msg})
 
-        current_fs_snapshot = self._filesystem_snapshot()
-        env_parts = [f"[filesystem]\n{current_fs_snapshot}"]
+        env_parts = [f"[filesystem]\n{fs_snapshot}"]
         if self.last_shell_output:
             env_parts.append(f"[shell_output]\n{self.last_shell_output}")
 
-        context.append({"role": "assistant", "content": "\n".join(env_parts)})
-        context.append({"role": "user", "content": user_msg})
+        context.append({"role": "system", "content": "\n".join(env_parts)})
         return context
 
-    def _call_llm(self, messages: List[Dict[str, str]]) -> str:
-        num_tokens = sum(len(self.encoding.encode(msg["content"])) for msg in messages)
-        with self.report_path.open("a", encoding="utf-8") as f:
-            f.write(f"### Turn {len(self.history) // 2 + 1} ({num_tokens} tokens)\n\n")
-            f.write("<h4>CONTEXT DIFF</h4>\n")
-            diff_messages = messages[len(self.last_context):]
-            new_fs_snapshot = self._filesystem_snapshot()
-            is_fs_unchanged = new_fs_snapshot == self.last_fs_snapshot
-            self.last_fs_snapshot = new_fs_snapshot
-            for msg in diff_messages:
-                f.write(self._format_message_for_report(msg, is_fs_unchanged=is_fs_unchanged))
-            self.last_context = messages
-            f.write("\n\n")
-
-        response = openai.chat.completions.create(
+    def _count_tokens(self, messages: Sequence[Dict[str, Any]]) -> int:
+        """Count prompt tokens, only encoding messages not seen on a previous turn.
+
+        Counts are keyed by ``id(msg)``; after each call the cache is pruned to
+        the messages still held in ``self.history`` so ids of discarded
+        per-turn messages are never reused for a stale count.
+        """
+        missing = [msg for msg in messages if id(msg) not in self._token_cache]
+        if missing:
+            encoded = self.encoding.encode_batch([_message_text(msg) for msg in missing])
+            for msg, tokens in zip(missing, encoded):
+                self._token_cache[id(msg)] = len(tokens)
+        num_tokens = sum(self._token_cache[id(msg)] for msg in messages)
+
+        live = {id(msg) for msg in self.history}
+        self._token_cache = {key: count for key, count in self._token_cache.items() if key in live}
+        return num_tokens
+
+    async def _call_llm(self, messages: List[Dict[str, Any]], fs_snapshot: str, turn: int) -> Dict[str, Any]:
+        """Stream one assistant message, returning it in chat-completions message form."""
+        num_tokens = self._static_prefix_tokens + self._count_tokens(messages[len(self._static_prefix):])
+        is_fs_unchanged = fs_snapshot == self.last_fs_snapshot
+        self.last_fs_snapshot = fs_snapshot
+        parts = [f"### Turn {turn} ({num_tokens} tokens)\n\n", "<h4>CONTEXT DIFF</h4>\n"]
+        parts.extend(
+            self._format_message_for_report(msg, is_fs_unchanged=is_fs_unchanged)
+            for msg in messages[len(self.last_context):]
+        )
+        parts.append("\n\n")
+        self._write_report("".join(parts))
+        self.last_context = messages
+
+        stream = await self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             temperature=0.1,
+            tools=TOOL_SCHEMAS,
+            parallel_tool_calls=True,
+            stream=True,
         )
-        assistant_response = response.choices[0].message.content.strip()
-
-        with self.report_path.open("a", encoding="utf-8") as f:
-            f.write("<h4>LLM ANSWER</h4>\n")
-            try:
-                payload = json.loads(assistant_response)
-                explanation = payload.get("explanation", "")
-                tool = payload.get("tool")
-                arg = payload.get("arg")
-                answer = payload.get("answer")
-
-                content = f"<b>Thought:</b> {explanation}<br/>"
-                if tool:
-                    content += f"<b>Tool:</b> {tool} | <b>Arg:</b> {arg}"
-                if answer:
-                    content += f"<b>Answer:</b> {answer}"
-
-                f.write(
-                    f'<div style="background-color: #fce4ec; padding: 2px; margin: 0; border-radius: 5px; font-family: monospace;">{content}</div>'
-                )
-            except json.JSONDecodeError:
-                f.write(
-                    f'<div style="background-color: #fce4ec; padding: 2px; margin: 0; border-radius: 5px; font-family: monospace;">'
-                    f'<pre>{assistant_response}</pre></div>'
+        chunks: List[str] = []
+        calls: Dict[int, Dict[str, Any]] = {}
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                chunks.append(delta.content)
+                console.print(delta.content, end="", style="dim", markup=False, highlight=False)
+            for tc in delta.tool_calls or ():
+                call = calls.get(tc.index)
+                if call is None:
+                    # Calls stream one after another, so a new index means
+                    # the previous call's arguments are complete.
+                    if calls:
+                        self._on_tool_call_ready(calls[max(calls)])
+                    call = calls[tc.index] = {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+                if tc.id:
+                    call["id"] = tc.id
+                if tc.function is not None:
+                    call["function"]["name"] += tc.function.name or ""
+                    call["function"]["arguments"] += tc.function.arguments or ""
+        console.print()
+
+        message: Dict[str, Any] = {"role": "assistant", "content": "".join(chunks).strip() or None}
+        if calls:
+            message["tool_calls"] = [calls[index] for index in sorted(calls)]
+
+        self._write_report(
+            "".join(
+                (
+                    "<h4>LLM ANSWER</h4>\n",
+                    _DIV_TEMPLATE.format(color="#fce4ec", body=_format_assistant(message)),
+                    "\n\n---\n\n",
                 )
-            f.write("\n\n---\n\n")
+            )
+        )
+
+        return message
+
+    def _on_tool_call_ready(self, call: Dict[str, Any]) -> None:
+        """Called as soon as a streamed tool call has been fully emitted.
+
+        Read-only network tools are started right away so their I/O overlaps
+        with the remainder of the model's generation.
+        """
+        tool_name = call["function"]["name"]
+        if tool_name not in self.tools:
+            console.print(f"\n[red]✗ Model requested unknown tool: {tool_name}[/red]")
+            return
+        arg = _call_arg(call)
+        if tool_name in PREFETCHABLE_TOOLS and arg is not None:
+            self._prefetch[call["id"]] = asyncio.create_task(self._run_tool(tool_name, arg))
+
+    def _store_result(self, result: str) -> str:
+        """Keep a long tool result out of band and return the excerpt sent to the model."""
+        if len(result) <= RESULT_EXCERPT_CHARS:
+            return result
+        result_id = uuid.uuid4().hex[:8]
+        self._results[result_id] = result
+        if len(self._results) > RESULT_STORE_SIZE:
+            self._results.popitem(last=False)
+        return (
+            f"{result[:RESULT_EXCERPT_CHARS]}\n"
+            f"... [truncated {len(result)} chars, use fetch_result with '{result_id}:{RESULT_EXCERPT_CHARS}']"
+        )
+
+    def _fetch_result(self, arg: str) -> str:
+        """Return one page of a stored result; the model pages through it by offset."""
+        result_id, _, offset_str = arg.strip().partition(":")
+        result = self._results.get(result_id)
+        if result is None:
+            return f"[fetch_result error] Unknown result id: {result_id}"
+        try:
+            offset = max(int(offset_str or 0), 0)
+        except ValueError:
+            return f"[fetch_result error] Invalid offset: {offset_str}"
 
-        return assistant_response
+        end = offset + RESULT_PAGE_CHARS
+        page = result[offset:end]
+        if end < len(result):
+            page += f"\n... [{len(result) - end} more chars, use fetch_result with '{result_id}:{end}']"
+        return page
+
+    @staticmethod
+    def _tool_cache_key(tool_name: str, arg: str) -> Optional[Tuple]:
+        if tool_name == "fs_read":
+            try:
+                file_path = Path(arg).expanduser().resolve()
+                stat = file_path.stat()
+            except (OSError, ValueError):
+                return None
+            return (tool_name, str(file_path), stat.st_mtime_ns, stat.st_size)
+        if tool_name in NETWORK_CACHE_TOOLS:
+            return (tool_name, arg)
+        return None
+
+    async def _run_tool(self, tool_name: str, arg: str) -> str:
+        tool = self.tools.get(tool_name)
+        if tool is None:
+            return f"[error] Unknown tool: {tool_name}"
+
+        key = self._tool_cache_key(tool_name, arg)
+        if key is not None:
+            cached = self._tool_cache.get(key)
+            if cached is not None:
+                expires_at, result = cached
+                if expires_at is None or expires_at > time.monotonic():
+                    self._tool_cache.move_to_end(key)
+                    tokens = len(self.encoding.encode(result))
+                    console.print(f"[dim]⚡ cache hit for {tool_name} ({tokens} tokens saved)[/dim]")
+                    return result
+                del self._tool_cache[key]
+
+        async with self._tool_semaphore:
+            result = await tool(arg)
+
+        if key is not None and not _ERROR_RESULT.match(result):
+            expires_at = time.monotonic() + NETWORK_CACHE_TTL if tool_name in NETWORK_CACHE_TOOLS else None
+            self._tool_cache[key] = (expires_at, result)
+            if len(self._tool_cache) > TOOL_CACHE_SIZE:
+                self._tool_cache.popitem(last=False)
+        return result
+
+    async def _dispatch_tool(self, call: Dict[str, Any]) -> str:
+        """Run one requested tool call and return the result text for the history.
+
+        A speculative run started during streaming is reused if there is one.
+        """
+        tool_name = call["function"]["name"]
+        arg = _call_arg(call)
+        console.print(f"⚙️  Running [bold cyan]{tool_name}[/bold cyan]: [dim]'{arg}'[/dim]")
+
+        if tool_name not in self.tools:
+            return f"[error] Unknown tool: {tool_name}"
+        if arg is None:
+            return f"[error] Invalid arguments for {tool_name}: {call['function']['arguments']}"
+
+        task = self._prefetch.pop(call["id"], None)
+        result = await task if task is not None else await self._run_tool(tool_name, arg)
+        if tool_name in MUTATING_TOOLS:
+            self._fs_cache = None
+        if result:
+            console.print(f"↪️  [dim]{result}[/dim]")
+        return result if tool_name == "fetch_result" else self._store_result(result)
+
+    def _cancel_prefetch(self) -> None:
+        for task in self._prefetch.values():
+            task.cancel()
+        self._prefetch.clear()
+
+    async def _compact_history(self) -> None:
+        """Replace older history with an LLM-written summary once it grows too large."""
+        if len(self.history) <= HISTORY_KEEP_RECENT:
+            return
+        if self._count_tokens(self.history) <= HISTORY_TOKEN_LIMIT:
+            return
+
+        cut = _compaction_cut(self.history)
+        old, recent = self.history[:cut], self.history[cut:]
+        # When the kept tail alone is over budget, `old` may be little more
+        # than the previous summary; re-summarizing it would cost an LLM call
+        # every turn without shrinking anything.
+        if self._count_tokens(old) < HISTORY_COMPACT_MIN_TOKENS:
+            return
+
+        transcript = "\n\n".join(f"{msg['role']}: {_message_text(msg)}" for msg in old)
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": transcript},
+                ],
+                temperature=0.1,
+                max_tokens=400,
+            )
+        except openai.OpenAIError as exc:
+            console.print(f"[red]✗ History compaction failed: {exc}")
+            return
+
+        summary = response.choices[0].message.content.strip()
+        self.history = [{"role": "system", "content": f"[summary]\n{summary}"}, *recent]
+        self.last_context = []
+        console.print(f"[dim]🗜️  Compacted {len(old)} history messages into a summary[/dim]")
 
     def run(self, user_input: str) -> None:
-        with self.report_path.open("a", encoding="utf-8") as f:
-            f.write(f"**User Query:** `{user_input}`\n\n")
+        self._loop.run_until_complete(self.run_async(user_input))
+
+    async def run_async(self, user_input: str) -> None:
+        self._write_report(f"**User Query:** `{user_input}`\n\n")
 
         turn = 0
         pending_user_msg = user_input
         while turn < self.max_turns:
             turn += 1
-            context = self._build_context(pending_user_msg)
-            assistant_raw = self._call_llm(context)
-
-            try:
-                payload = json.loads(assistant_raw)
-            except json.JSONDecodeError:
-                console.print("[red]✗ Invalid JSON, retrying.")
-                self.history.append({"role": "assistant", "content": assistant_raw})
-                self.history.append({"role": "user", "content": "Your last response was not valid JSON. Please correct it."})
-                continue
+            await self._compact_history()
+            fs_snapshot = self._filesystem_snapshot()
+            context = self._build_context(pending_user_msg, fs_snapshot)
+            message = await self._call_llm(context, fs_snapshot, turn)
+            tool_calls = message.get("tool_calls", [])
+
+            payload: Dict[str, Any] = {}
+            if message["content"]:
+                try:
+                    payload = orjson.loads(message["content"])
+                except json.JSONDecodeError:
+                    if not tool_calls:
+                        console.print("[red]✗ Invalid JSON, retrying.")
+                        self.history.append(message)
+                        self.history.append({"role": "user", "content": "Your last response was not valid JSON. Please correct it."})
+                        continue
+                if not isinstance(payload, dict):
+                    payload = {}
 
             if "state_analysis" in payload:
                 console.print(f"🤔 [bold]State Analysis:[/bold] {payload.get('state_analysis', 'N/A')}")
@@ -249,35 +590,30 @@ class ReasoningAgent:
                 console.print(f"🚀 [bold]Next Steps:[/bold] {payload.get('next_steps', 'N/A')}")
                 console.print(f"🧠 [bold]Reasoning:[/bold] {payload.get('reasoning', 'N/A')}")
 
-            if "tool" in payload and payload["tool"]:
-                tool_name = payload["tool"]
-                arg = payload.get("arg", "")
+            if tool_calls:
+                results = await asyncio.gather(*(self._dispatch_tool(call) for call in tool_calls))
+                self._cancel_prefetch()
+                self.last_shell_output = "\n\n".join(results)
 
-                console.print(f"⚙️  Running [bold cyan]{tool_name}[/bold cyan]: [dim]'{arg}'[/dim]")
-
-                tool = TOOLS.get(tool_name)
-                if tool is None:
-                    self.last_shell_output = f"[error] Unknown tool: {tool_name}"
-                else:
-                    result = tool(arg)
-                    self.last_shell_output = result
-                    if result:
-                        console.print(f"↪️  [dim]{result}[/dim]")
-
-                self.history.append({"role": "assistant", "content": assistant_raw})
-                self.history.append({"role": "assistant", "content": f"[tool_result]\n{self.last_shell_output}"})
+                self.history.append(message)
+                self.history.extend(
+                    {"role": "tool", "tool_call_id": call["id"], "content": result}
+                    for call, result in zip(tool_calls, results)
+                )
                 pending_user_msg = "(continue)"
                 continue
 
+            self._cancel_prefetch()
+
             if "answer" in payload:
                 console.print(f"✅ [bold green]Answer:[/bold green] {payload['answer']}")
                 break
 
             if "state_analysis" in payload:
                 pending_user_msg = "(continue)"
-                self.history.append({"role": "assistant", "content": assistant_raw})
-                self.history.append({"role": "user", "content": "Your plan is noted. Please provide a `tool` to execute next or a final `answer`."})
+                self.history.append(message)
+                self.history.append({"role": "user", "content": "Your plan is noted. Please call a tool to execute next or provide a final `answer`."})
                 continue
 
-            console.print(f"[red]✗ Unrecognized payload: {payload}")
+            console.print(f"[red]✗ Unrecognized payload: {payload or message['content']}")
             break
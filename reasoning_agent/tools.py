@@ -1,43 +1,222 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import atexit
+import base64
+import codecs
+import inspect
+import locale
+import os
+import queue
 import subprocess
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
 from pathlib import Path
-from typing import Callable, Dict
+from stat import S_ISREG
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
 
 from duckduckgo_search import DDGS
-import requests
-from bs4 import BeautifulSoup
+import httpx
+import orjson
+import trafilatura
+from lxml import html as lxml_html
+
+# Shared clients so repeated searches/browses reuse pooled TLS connections.
+_DDGS = DDGS()
+
+_HTML_PARSER = lxml_html.HTMLParser(recover=True)
+MAX_PAGE_BYTES = 2_000_000
+
+# Top search hits are downloaded speculatively while the model decides which
+# one to browse; browse_web_page picks the body up from here.
+PREFETCH_RESULTS = 3
+URL_CACHE_SIZE = 32
+
+# Page body plus the charset from its Content-Type header, if any.
+Page = Tuple[bytes, Optional[str]]
+
+
+class _LoopState:
+    """Async web resources bound to one event loop.
+
+    Pooled httpx connections, semaphores and tasks belong to the loop that
+    created them, so each loop driving the tools gets its own client and
+    prefetch cache.
+    """
+
+    def __init__(self) -> None:
+        self.http = httpx.AsyncClient(
+            http2=True,
+            timeout=15,
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=16),
+        )
+        self.prefetch_limit = asyncio.Semaphore(PREFETCH_RESULTS)
+        self.url_cache: OrderedDict[str, asyncio.Task[Page]] = OrderedDict()
+
+
+_LOOP_STATE: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState] = weakref.WeakKeyDictionary()
+
+
+def _loop_state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _LOOP_STATE.get(loop)
+    if state is None:
+        state = _LOOP_STATE[loop] = _LoopState()
+    return state
+
+
+async def aclose_web_clients() -> None:
+    """Cancel pending prefetches and close the web resources of the running event loop."""
+    state = _LOOP_STATE.pop(asyncio.get_running_loop(), None)
+    if state is None:
+        return
+    for task in state.url_cache.values():
+        task.cancel()
+    await asyncio.gather(*state.url_cache.values(), return_exceptions=True)
+    await state.http.aclose()
 
 
 class Tool:
-    """Base callable tool."""
+    """Base awaitable tool.
 
-    def __init__(self, name: str, description: str, fn: Callable[[str], str]):
+    ``fn`` may be a plain function or a coroutine function; blocking functions
+    are run in a worker thread so they don't stall the agent's event loop.
+    """
+
+    def __init__(self, name: str, description: str, fn: Callable[[str], Union[str, Awaitable[str]]]):
         self.name = name
         self.description = description
         self.fn = fn
 
-    def __call__(self, arg: str) -> str:
-        return self.fn(arg)
+    async def __call__(self, arg: str) -> str:
+        if inspect.iscoroutinefunction(self.fn):
+            return await self.fn(arg)
+        return await asyncio.to_thread(self.fn, arg)
 
 
 # ---------------------------------------------------------------------------
 # Individual tool implementations
 # ---------------------------------------------------------------------------
 
-def shell_tool(command: str) -> str:
-    """Execute *read-only* shell commands with PowerShell (Windows only) and capture output."""
-    try:
-        completed = subprocess.run(
-            ["powershell", "-Command", command],
+class _PowerShellSession:
+    """Long-lived PowerShell process fed commands over stdin.
+
+    Starting ``powershell.exe`` costs hundreds of milliseconds, so one process
+    is kept alive and each command is followed by an echoed sentinel that
+    marks the end of its output. Output is collected as raw bytes up to a
+    cap; a command that exceeds the cap or the timeout kills the process and
+    the next call starts a fresh one.
+    """
+
+    def __init__(self) -> None:
+        self._proc: Optional[subprocess.Popen[bytes]] = None
+        self._chunks: queue.Queue[Optional[bytes]] = queue.Queue()
+        self._lock = threading.Lock()
+
+    def _start(self) -> None:
+        self._proc = subprocess.Popen(
+            ["powershell", "-NoProfile", "-NoLogo", "-Command", "-"],
+            stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True,
-            timeout=15,
+            bufsize=0,
         )
-        output = completed.stdout.strip()
-        if len(output.encode("utf-8")) > 24000:
+        self._chunks = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._proc, self._chunks), daemon=True).start()
+
+    @staticmethod
+    def _pump(proc: subprocess.Popen[bytes], chunks: queue.Queue[Optional[bytes]]) -> None:
+        fd = proc.stdout.fileno()
+        while True:
+            try:
+                data = os.read(fd, 65536)
+            except OSError:
+                break
+            if not data:
+                break
+            chunks.put(data)
+        chunks.put(None)
+
+    def close(self) -> None:
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc = None
+
+    def run(self, command: str, timeout: float, max_bytes: int) -> str:
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            sentinel = f"<<<END:{uuid.uuid4().hex}>>>"
+            # Each command starts in the agent's CWD so a `Set-Location` can't
+            # leave later commands out of sync with fs_read/fs_write. The script
+            # travels as base64 UTF-8 on a single line: stdin mode would submit
+            # a block early at its first blank line, and the console input code
+            # page can't carry arbitrary characters.
+            cwd = os.getcwd().replace("'", "''")
+            script = f"Set-Location -LiteralPath '{cwd}'\n{command}"
+            encoded = base64.b64encode(script.encode("utf-8")).decode("ascii")
+            line = (
+                ". ([ScriptBlock]::Create([Text.Encoding]::UTF8.GetString("
+                f"[Convert]::FromBase64String('{encoded}'))))\nWrite-Output '{sentinel}'\n"
+            )
+            try:
+                self._proc.stdin.write(line.encode("ascii"))
+                self._proc.stdin.flush()
+            except OSError:
+                self.close()
+                raise
+
+            marker = sentinel.encode(_SHELL_ENCODING)
+            output = bytearray()
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    chunk = self._chunks.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    self.close()
+                    raise subprocess.TimeoutExpired(command, timeout) from None
+                if chunk is None:
+                    # The command ended the session (e.g. `exit`).
+                    self._proc = None
+                    break
+                search_from = max(len(output) - len(marker), 0)
+                output += chunk
+                end = output.find(marker, search_from)
+                if end != -1:
+                    del output[end:]
+                    break
+                if len(output) > max_bytes:
+                    self.close()
+                    output += b"\n... (output limit reached, command stopped) ..."
+                    break
+            return output.decode(_SHELL_ENCODING, errors="replace")
+
+
+_SHELL_ENCODING = locale.getpreferredencoding(False)
+_POWERSHELL = _PowerShellSession()
+atexit.register(_POWERSHELL.close)
+
+SHELL_OUTPUT_LIMIT = 24000
+FS_READ_LIMIT = 128_000
+# Wide-character text contains NUL bytes, so it is recognised by its BOM
+# before the binary check. UTF-32 goes first: its LE BOM starts like UTF-16's.
+_TEXT_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def shell_tool(command: str) -> str:
+    """Execute *read-only* shell commands with PowerShell (Windows only) and capture output."""
+    try:
+        output = _POWERSHELL.run(command, timeout=15, max_bytes=SHELL_OUTPUT_LIMIT * 2).strip()
+        if len(output.encode("utf-8")) > SHELL_OUTPUT_LIMIT:
             output = output[:8000] + "\n... (output truncated) ...\n" + output[-8000:]
         return output
     except Exception as exc:  # noqa: BLE001
@@ -46,12 +225,35 @@ def shell_tool(command: str) -> str:
 
 def fs_read_tool(path: str) -> str:
     """Read text files (<128 KB) relative to CWD."""
-    file_path = Path(path).expanduser().resolve()
-    if not file_path.is_file():
+    file_path = Path(path).expanduser()
+    try:
+        file_path = file_path.resolve()
+        # Opening a FIFO or device for reading can block forever, so only
+        # regular files are opened, and without blocking in case the path
+        # is swapped between the check and the open.
+        if not S_ISREG(file_path.stat().st_mode):
+            return f"[fs error] File not found: {file_path}"
+        flags = os.O_RDONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_NONBLOCK", 0)
+        fd = os.open(file_path, flags)
+    except (FileNotFoundError, ValueError):
         return f"[fs error] File not found: {file_path}"
-    if file_path.stat().st_size > 128_000:
-        return "[fs error] File too large (>128 KB)."
-    return file_path.read_text(encoding="utf-8", errors="ignore")
+    except OSError as exc:
+        return f"[fs error] {exc}"
+    try:
+        stat = os.fstat(fd)
+        if not S_ISREG(stat.st_mode):
+            return f"[fs error] File not found: {file_path}"
+        if stat.st_size > FS_READ_LIMIT:
+            return "[fs error] File too large (>128 KB)."
+        data = os.read(fd, FS_READ_LIMIT)
+    finally:
+        os.close(fd)
+    for bom, encoding in _TEXT_BOMS:
+        if data.startswith(bom):
+            return data.decode(encoding, errors="ignore")
+    if b"\0" in data:
+        return f"[fs error] Binary file: {file_path}"
+    return data.decode("utf-8", errors="ignore")
 
 
 def fs_write_tool(path_content: str) -> str:
@@ -73,22 +275,91 @@ def fs_write_tool(path_content: str) -> str:
         return f"[fs error] {exc}"
 
 
-def web_search_tool(query: str) -> str:
+async def _download(state: _LoopState, url: str) -> Page:
+    """GET *url*, reading no more than ``MAX_PAGE_BYTES`` of its body."""
+    body = bytearray()
+    async with state.http.stream("GET", url) as response:
+        async for chunk in response.aiter_bytes():
+            body += chunk
+            if len(body) >= MAX_PAGE_BYTES:
+                break
+        return bytes(body[:MAX_PAGE_BYTES]), response.charset_encoding
+
+
+async def _fetch_page(state: _LoopState, url: str) -> Page:
+    async with state.prefetch_limit:
+        return await _download(state, url)
+
+
+def _prefetch_page(url: str) -> None:
+    state = _loop_state()
+    if url in state.url_cache:
+        return
+    task = asyncio.create_task(_fetch_page(state, url))
+    # Failed prefetches are simply refetched by browse_web_page; mark the
+    # exception as retrieved so asyncio doesn't log it.
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    state.url_cache[url] = task
+    while len(state.url_cache) > URL_CACHE_SIZE:
+        _, evicted = state.url_cache.popitem(last=False)
+        evicted.cancel()
+
+
+async def _get_page(url: str) -> Page:
+    state = _loop_state()
+    task = state.url_cache.pop(url, None)
+    if task is not None:
+        try:
+            return await task
+        except httpx.HTTPError:
+            # The prefetch failed; fetch the page directly.
+            pass
+    return await _download(state, url)
+
+
+async def web_search_tool(query: str) -> str:
     """Search the web using DuckDuckGo."""
     try:
-        with DDGS() as ddgs:
-            results = [r for r in ddgs.text(query, max_results=5)]
-        return json.dumps(results)
+        results = await asyncio.to_thread(lambda: list(_DDGS.text(query, max_results=5)))
+        for result in results[:PREFETCH_RESULTS]:
+            if result.get("href"):
+                _prefetch_page(result["href"])
+        return orjson.dumps(results).decode()
     except Exception as exc:
         return f"[web_search error] {exc}"
 
 
-def browse_web_page_tool(url: str) -> str:
-    """Fetch and parse the content of a web page."""
+def _html_parser(charset: Optional[str]) -> lxml_html.HTMLParser:
+    """Parser for a page whose HTTP header declared *charset*.
+
+    Without a (known) header charset lxml falls back to the page's BOM or
+    ``<meta charset>``.
+    """
+    if charset:
+        try:
+            return lxml_html.HTMLParser(recover=True, encoding=charset)
+        except LookupError:
+            pass
+    return _HTML_PARSER
+
+
+def _page_text(content: bytes, charset: Optional[str] = None) -> str:
+    """Return the main article text of a page, falling back to all visible text."""
+    content = content[:MAX_PAGE_BYTES]
+    text = trafilatura.extract(content, include_comments=False, include_tables=False, favor_precision=True)
+    if text:
+        return text
+    tree = lxml_html.fromstring(content, parser=_html_parser(charset))
+    for element in tree.xpath("//script|//style|//noscript"):
+        element.drop_tree()
+    return tree.text_content()
+
+
+async def browse_web_page_tool(url: str) -> str:
+    """Fetch a web page and return its main-content text."""
     try:
-        response = requests.get(url, timeout=15)
-        soup = BeautifulSoup(response.content, "html.parser")
-        return soup.get_text()
+        content, charset = await _get_page(url)
+        return await asyncio.to_thread(_page_text, content, charset)
     except Exception as exc:
         return f"[browse_web_page error] {exc}"
 
@@ -103,5 +374,5 @@ TOOLS: Dict[str, Tool] = {
         fs_write_tool,
     ),
     "web_search": Tool("web_search", "Search the web with a query", web_search_tool),
-    "browse_web_page": Tool("browse_web_page", "Get the text content of a web page", browse_web_page_tool),
+    "browse_web_page": Tool("browse_web_page", "Get the main text content of a web page", browse_web_page_tool),
 }
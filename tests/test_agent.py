@@ -0,0 +1,274 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from reasoning_agent import agent as agent_module
+from reasoning_agent.agent import HISTORY_COMPACT_MIN_TOKENS, HISTORY_TOKEN_LIMIT, ReasoningAgent, _compaction_cut
+
+
+class FakeEncoding:
+    """Whitespace tokenizer so tests don't need tiktoken's downloaded BPE files."""
+
+    def encode(self, text):
+        return text.split()
+
+    def encode_batch(self, texts):
+        return [self.encode(text) for text in texts]
+
+
+class FakeCompletions:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def make_agent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(agent_module.tiktoken, "encoding_for_model", lambda model: FakeEncoding())
+    agents = []
+
+    def factory(responses=()):
+        agent = ReasoningAgent()
+        agent.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(responses)))
+        agents.append(agent)
+        return agent
+
+    yield factory
+    for agent in agents:
+        agent.close()
+
+
+def words(n):
+    return " ".join(["word"] * n)
+
+
+def tool_call_message(*ids):
+    calls = [{"id": i, "type": "function", "function": {"name": "fs_read", "arguments": "{}"}} for i in ids]
+    return {"role": "assistant", "content": None, "tool_calls": calls}
+
+
+def tool_message(call_id, content):
+    return {"role": "tool", "tool_call_id": call_id, "content": content}
+
+
+def summary_response(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def test_compaction_cut_keeps_tool_results_with_their_request():
+    history = [
+        {"role": "assistant", "content": "a"},
+        tool_call_message("c1", "c2", "c3"),
+        tool_message("c1", "x"),
+        tool_message("c2", "y"),
+        tool_message("c3", "z"),
+    ]
+    assert _compaction_cut(history, keep=4) == 1
+    assert _compaction_cut(history, keep=3) == 1
+    assert _compaction_cut(history[1:], keep=3) == 0
+    assert _compaction_cut(history[:2], keep=4) == 0
+
+
+def test_compaction_skips_when_only_summary_would_be_cut(make_agent):
+    agent = make_agent()
+    big = words(HISTORY_TOKEN_LIMIT)
+    agent.history = [
+        {"role": "system", "content": "[summary]\nearlier work"},
+        tool_call_message("c1", "c2", "c3"),
+        tool_message("c1", big),
+        tool_message("c2", "y"),
+        tool_message("c3", "z"),
+    ]
+    before = list(agent.history)
+
+    agent._loop.run_until_complete(agent._compact_history())
+
+    assert agent.client.chat.completions.calls == []
+    assert agent.history == before
+
+
+def test_compaction_summarizes_old_messages(make_agent):
+    agent = make_agent([summary_response("SUMMARY")])
+    recent = [tool_call_message("c1"), tool_message("c1", "ok"), {"role": "assistant", "content": "b"}, {"role": "user", "content": "c"}]
+    agent.history = [
+        {"role": "assistant", "content": words(HISTORY_TOKEN_LIMIT)},
+        {"role": "user", "content": words(HISTORY_COMPACT_MIN_TOKENS)},
+        *recent,
+    ]
+
+    agent._loop.run_until_complete(agent._compact_history())
+
+    assert len(agent.client.chat.completions.calls) == 1
+    assert agent.history == [{"role": "system", "content": "[summary]\nSUMMARY"}, *recent]
+
+    # The kept tail is small now, so the next turn must not compact again.
+    agent._loop.run_until_complete(agent._compact_history())
+    assert len(agent.client.chat.completions.calls) == 1
+
+
+def test_fetch_result_pages_long_results(make_agent):
+    agent = make_agent()
+    result = "".join(str(i % 10) for i in range(agent_module.RESULT_PAGE_CHARS + 100))
+
+    excerpt = agent._store_result(result)
+    result_id = next(iter(agent._results))
+    assert excerpt.startswith(result[: agent_module.RESULT_EXCERPT_CHARS])
+    assert f"'{result_id}:{agent_module.RESULT_EXCERPT_CHARS}'" in excerpt
+
+    first = agent._fetch_result(result_id)
+    assert first.startswith(result[: agent_module.RESULT_PAGE_CHARS])
+    assert f"100 more chars, use fetch_result with '{result_id}:{agent_module.RESULT_PAGE_CHARS}'" in first
+    assert agent._fetch_result(f"{result_id}:{agent_module.RESULT_PAGE_CHARS}") == result[-100:]
+    assert agent._fetch_result("nope").startswith("[fetch_result error]")
+
+
+def test_result_store_is_bounded(make_agent):
+    agent = make_agent()
+    for _ in range(agent_module.RESULT_STORE_SIZE + 5):
+        agent._store_result("x" * (agent_module.RESULT_EXCERPT_CHARS + 1))
+    assert len(agent._results) == agent_module.RESULT_STORE_SIZE
+
+
+def chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def call_delta(index, call_id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+async def stream(*chunks):
+    for item in chunks:
+        yield item
+
+
+def test_streamed_parallel_tool_calls_round_trip(make_agent, tmp_path):
+    (tmp_path / "a.txt").write_text("alpha")
+    (tmp_path / "b.txt").write_text("beta")
+    (tmp_path / "c.txt").write_text("gamma")
+    agent = make_agent(
+        [
+            stream(
+                chunk('{"state_analysis": "read", '),
+                chunk('"reasoning": "all at once"}'),
+                chunk(tool_calls=[call_delta(0, "c1", "fs_read", '{"arg": ')]),
+                chunk(tool_calls=[call_delta(0, arguments='"a.txt"}')]),
+                chunk(tool_calls=[call_delta(1, "c2", "fs_read", '{"arg": "b.txt"}')]),
+                chunk(tool_calls=[call_delta(2, "c3", "fs_read", '{"arg": "c.txt"}')]),
+            ),
+            stream(chunk('{"state_analysis": "done", "answer": "3 files"}')),
+        ]
+    )
+
+    agent.run("read all files")
+    agent.close()
+
+    calls = agent.client.chat.completions.calls
+    assert len(calls) == 2
+    assert calls[0]["parallel_tool_calls"] is True
+    assert {tool["function"]["name"] for tool in calls[0]["tools"]} >= {"fs_read", "fetch_result"}
+
+    assistant, *tool_results = agent.history
+    assert assistant["content"] == '{"state_analysis": "read", "reasoning": "all at once"}'
+    assert [(c["id"], c["function"]["name"], c["function"]["arguments"]) for c in assistant["tool_calls"]] == [
+        ("c1", "fs_read", '{"arg": "a.txt"}'),
+        ("c2", "fs_read", '{"arg": "b.txt"}'),
+        ("c3", "fs_read", '{"arg": "c.txt"}'),
+    ]
+    assert tool_results == [
+        {"role": "tool", "tool_call_id": "c1", "content": "alpha"},
+        {"role": "tool", "tool_call_id": "c2", "content": "beta"},
+        {"role": "tool", "tool_call_id": "c3", "content": "gamma"},
+    ]
+
+    # The second request sends the tool results right after the message that asked for them.
+    second = calls[1]["messages"]
+    start = second.index(assistant)
+    assert second[start + 1 : start + 4] == tool_results
+
+    report = (tmp_path / "query_report.md").read_text(encoding="utf-8")
+    assert "### Turn 1 " in report and "### Turn 2 " in report
+    assert "### Turn 3 " not in report
+
+
+def test_browse_returns_full_page_text(monkeypatch):
+    from reasoning_agent import tools
+
+    body = " ".join(f"sentence{i}." for i in range(2000))
+
+    async def fake_get_page(url):
+        return f"<html><body><p>{body}</p></body></html>".encode(), "utf-8"
+
+    monkeypatch.setattr(tools, "_get_page", fake_get_page)
+    text = asyncio.run(tools.browse_web_page_tool("https://example.com"))
+    assert "sentence0." in text and "sentence1999." in text
+    assert "browse_web_page_full" not in tools.TOOLS
+
+
+def test_tool_cache_key_skips_unusable_paths(tmp_path):
+    (tmp_path / "a.txt").write_text("alpha")
+    assert ReasoningAgent._tool_cache_key("fs_read", str(tmp_path / "a.txt"))[:2] == ("fs_read", str(tmp_path / "a.txt"))
+    assert ReasoningAgent._tool_cache_key("fs_read", str(tmp_path / "missing.txt")) is None
+    assert ReasoningAgent._tool_cache_key("fs_read", "a\0b") is None
+
+
+def test_fs_read_rejects_non_regular_paths(tmp_path):
+    from reasoning_agent.tools import fs_read_tool
+
+    assert fs_read_tool("a\0b").startswith("[fs error] File not found")
+    assert fs_read_tool(str(tmp_path)).startswith("[fs error] File not found")
+    if hasattr(os, "mkfifo"):
+        os.mkfifo(tmp_path / "fifo")
+        assert fs_read_tool(str(tmp_path / "fifo")).startswith("[fs error] File not found")
+
+
+def test_page_text_fallback_honours_declared_charset(monkeypatch):
+    from reasoning_agent import tools
+
+    monkeypatch.setattr(tools.trafilatura, "extract", lambda *args, **kwargs: None)
+    meta = '<html><head><meta charset="windows-1252"></head><body><p>Café crème</p></body></html>'
+    bare = "<html><body><p>Café crème</p></body></html>"
+    assert tools._page_text(meta.encode("cp1252")).strip() == "Café crème"
+    assert tools._page_text(bare.encode("utf-8"), "utf-8").strip() == "Café crème"
+    assert tools._page_text(bare.encode("cp1252"), "windows-1252").strip() == "Café crème"
+    assert tools._page_text(meta.encode("cp1252"), "no-such-charset").strip() == "Café crème"
+
+
+def test_page_downloads_stop_at_size_cap(monkeypatch):
+    from reasoning_agent import tools
+
+    monkeypatch.setattr(tools, "MAX_PAGE_BYTES", 1000)
+    sent = []
+
+    async def body():
+        for _ in range(100):
+            sent.append(100)
+            yield b"x" * 100
+
+    def handler(request):
+        return httpx.Response(200, headers={"Content-Type": "text/html; charset=utf-8"}, content=body())
+
+    async def main():
+        state = tools._loop_state()
+        await state.http.aclose()
+        state.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        tools._prefetch_page("https://example.com/big")
+        prefetched = await tools._get_page("https://example.com/big")
+        direct = await tools._get_page("https://example.com/big")
+        await tools.aclose_web_clients()
+        return prefetched, direct
+
+    for content, charset in asyncio.run(main()):
+        assert content == b"x" * 1000
+        assert charset == "utf-8"
+    assert sum(sent) <= 2 * 1100